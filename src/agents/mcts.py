@@ -1,55 +1,208 @@
 # mcts_node.py
 import math
+import sys
 
 from games.game_state import GameState
 
 
 class MCTSNode:
-    def __init__(self, state: GameState, parent=None, prior=0.0):
+    __slots__ = ('state', 'parent', 'children', 'visit_count', 'total_value', 'prior', 'is_expanded', 'network_value')
+
+    def __init__(self, state: GameState = None, parent=None, prior=0.0):
+        self.children = {}  # action -> MCTSNode
+        self.reset(state, parent, prior)
+
+    def reset(self, state: GameState, parent=None, prior=0.0):
         self.state = state
         self.parent = parent
-        self.children = {}  # action -> MCTSNode
+        self.children.clear()
         self.visit_count = 0
         self.total_value = 0.0
         self.prior = prior  # P(s, a)
         self.is_expanded = False
+        self.network_value = None  # value predicted by the network, kept if the node is collapsed
 
     @property
     def mean_value(self):
         return self.total_value / self.visit_count if self.visit_count > 0 else 0.0
 
+# node_pool.py
+
+# Upper bound on the moves from one position (Othello: 64 squares + pass). Each simulation
+# expands at most one node, so a search never needs more than 1 + num_simulations * this.
+DEFAULT_MAX_BRANCHING = 65
+
+
+def estimate_node_bytes(state: GameState) -> int:
+    """
+    Rough upper bound on the memory held by one node wrapping `state`:
+    the node itself, its children dict, its entry in the parent's dict and the state.
+    """
+    size = sys.getsizeof(MCTSNode()) + 2 * sys.getsizeof({})
+    size += sys.getsizeof(state)
+    for value in getattr(state, '__dict__', {}).values():
+        size += sys.getsizeof(value)  # includes the data buffer of arrays owning their data
+    return size
+
+
+class NodePool:
+    """
+    Pool of at most `capacity` MCTSNode objects, of which `preallocate` are created upfront
+    (all of them by default) and the rest on first use.
+
+    Nodes are handed out by `allocate` and returned with `free_children` or, in bulk,
+    with `free_all`. Freed nodes drop their state so the underlying boards can be collected.
+    Nodes are handed out in order, so `_next` marks the high-water index past which
+    no node has been used since the last `free_all`.
+    """
+
+    def __init__(self, capacity: int, node_bytes: int = 0, preallocate: int = None):
+        if capacity < 1:
+            raise ValueError(f"Node pool capacity must be positive, got {capacity}.")
+        self.capacity = capacity
+        self.node_bytes = node_bytes
+        if preallocate is None:
+            preallocate = capacity
+        self._nodes = [MCTSNode() for _ in range(min(preallocate, capacity))]
+        self._next = 0
+        self._free = []
+        self.peak_in_use = 0
+
+    @property
+    def in_use(self) -> int:
+        return self._next - len(self._free)
+
+    @property
+    def available(self) -> int:
+        return self.capacity - self.in_use
+
+    def allocate(self, state: GameState, parent=None, prior=0.0):
+        """Returns a node initialised with the given fields, or None if the pool is exhausted."""
+        if self._free:
+            node = self._free.pop()
+        elif self._next < self.capacity:
+            if self._next == len(self._nodes):
+                self._nodes.append(MCTSNode())
+            node = self._nodes[self._next]
+            self._next += 1
+        else:
+            return None
+        node.reset(state, parent, prior)
+        self.peak_in_use = max(self.peak_in_use, self.in_use)
+        return node
+
+    def free_children(self, node):
+        """Returns every descendant of `node` to the pool and marks `node` as unexpanded."""
+        stack = list(node.children.values())
+        while stack:
+            child = stack.pop()
+            stack.extend(child.children.values())
+            self._release(child)
+        node.children.clear()
+        node.is_expanded = False
+
+    def free_all(self):
+        """Returns every node to the pool, in time proportional to the high-water mark."""
+        for node in self._nodes[:self._next]:
+            node.reset(None)
+        self._next = 0
+        self._free = []
+
+    def reset_stats(self):
+        self.peak_in_use = self.in_use
+
+    def stats(self) -> dict:
+        return {
+            'capacity': self.capacity,
+            'nodes_in_use': self.in_use,
+            'occupancy': self.in_use / self.capacity,
+            'peak_nodes': self.peak_in_use,
+            'peak_bytes_estimate': self.peak_in_use * self.node_bytes,  # peak_nodes * estimate_node_bytes
+        }
+
+    def _release(self, node):
+        node.reset(None)
+        self._free.append(node)
+
 # mcts.py
 
 class MCTS:
     def __init__(self, neural_network, config):
         self.neural_network = neural_network
-        self.config = config  # Hyperparameters like c_puct, number of simulations
+        self.config = config  # Hyperparameters like c_puct, number of simulations, max_nodes / max_memory_bytes
+        self.pool = None
+        self.pruned_nodes = 0
+        self.last_search_stats = {}
+
+    def build_pool(self, sample_state: GameState) -> NodePool:
+        """
+        Preallocates the pool when a cap is configured. Without one, the pool is sized
+        so that it can never fill up and grows lazily.
+        """
+        node_bytes = estimate_node_bytes(sample_state)
+        if self.config.get('max_nodes') is not None:
+            return NodePool(self.config['max_nodes'], node_bytes)
+        if self.config.get('max_memory_bytes') is not None:
+            capacity = self.config['max_memory_bytes'] // node_bytes
+            if capacity < 1:
+                raise ValueError(
+                    f"max_memory_bytes={self.config['max_memory_bytes']} is smaller than one node "
+                    f"(~{node_bytes} bytes)."
+                )
+            return NodePool(capacity, node_bytes)
+        max_branching = self.config.get('max_branching', DEFAULT_MAX_BRANCHING)
+        capacity = 1 + self.config['num_simulations'] * max_branching
+        return NodePool(capacity, node_bytes, preallocate=0)
 
     def search(self, initial_state: GameState):
-        root = MCTSNode(state=initial_state)
-        policy, value = self.neural_network.predict(initial_state)
-        self.expand_node(root, policy)
-
-        for _ in range(self.config['num_simulations']):
-            node = root
-            search_path = [node]
-
-            # Selection
-            while node.is_expanded and not node.state.is_terminal():
-                action, node = self.select_child(node)
-                search_path.append(node)
-
-            # Evaluation
-            if not node.state.is_terminal():
-                policy, value = self.neural_network.predict(node.state)
-                self.expand_node(node, policy)
-            else:
-                value = node.state.get_reward()
+        if self.pool is None:
+            self.pool = self.build_pool(initial_state)
+        self.pool.reset_stats()
+        self.pruned_nodes = 0
+
+        try:
+            root = self.pool.allocate(initial_state)
+            if root is None:
+                raise RuntimeError("Node pool is exhausted before the search started.")
+            policy, value = self.neural_network.predict(initial_state)
+            root.network_value = value
+            self.expand_node(root, policy, [root])
+            if not root.is_expanded:
+                raise RuntimeError(
+                    f"Node pool of {self.pool.capacity} nodes cannot hold the "
+                    f"{len(initial_state.get_valid_actions())} children of the root."
+                )
 
-            # Backpropagation
-            self.backpropagate(search_path, value)
+            for _ in range(self.config['num_simulations']):
+                self.run_simulation(root)
 
-        return self.get_action_probs(root)
+            return self.get_action_probs(root)
+        finally:
+            self.last_search_stats = dict(self.pool.stats(), pruned_nodes=self.pruned_nodes)
+            self.pool.free_all()
+
+    def run_simulation(self, root):
+        node = root
+        search_path = [node]
+
+        # Selection
+        while node.is_expanded and not node.state.is_terminal():
+            action, node = self.select_child(node)
+            search_path.append(node)
+
+        # Evaluation
+        if node.state.is_terminal():
+            value = node.state.get_reward()
+        elif node.network_value is not None and not self.make_room(node, search_path):
+            # Already evaluated and pruning cannot free room for its children: reuse the value
+            value = node.network_value
+        else:
+            policy, value = self.neural_network.predict(node.state)
+            node.network_value = value
+            self.expand_node(node, policy, search_path)
+
+        # Backpropagation
+        self.backpropagate(search_path, value)
 
 
 
@@ -74,19 +227,67 @@ class MCTS:
         return child.mean_value + pb_c
 
 
-    def expand_node(self, node, policy):
-        node.is_expanded = True
+    def make_room(self, node, search_path) -> bool:
+        """Prunes if needed so that the children of `node` fit in the pool; returns whether they do."""
+        needed = len(node.state.get_valid_actions())
+        if self.pool.available < needed:
+            self.prune(needed, search_path)
+        return self.pool.available >= needed
+
+    def expand_node(self, node, policy, search_path):
+        if not self.make_room(node, search_path):
+            # Nothing left to prune: keep the node as a leaf, its network value is still backed up
+            return
         valid_actions = node.state.get_valid_actions()
+
+        node.is_expanded = True
         policy_probs = policy.detach().numpy()
     
         for action in valid_actions:
             action_index = action.to_index()
             child_state = node.state.apply_action(action)
             prior = policy_probs[action_index]
-            child_node = MCTSNode(state=child_state, parent=node, prior=prior)
+            child_node = self.pool.allocate(child_state, parent=node, prior=prior)
             node.children[action] = child_node
 
 
+    def prune(self, needed, search_path):
+        """
+        Frees at least `needed` nodes by collapsing the least-visited frontier nodes
+        (expanded nodes whose children are all leaves) back into leaves.
+        Nodes on the current search path are kept. Frees a tenth of the pool at a time
+        so that the tree walk is not repeated on every expansion.
+
+        A collapsed node keeps its visit statistics and network value but loses its policy,
+        so expanding it again costs a new network call. Under a tight cap this trades
+        repeated evaluations for bounded memory; a node that still cannot be expanded after
+        pruning backs up its cached value instead of calling the network again.
+        """
+        target = max(needed, self.pool.capacity // 10)
+        protected = set(map(id, search_path))
+        root = search_path[0]
+
+        frontier = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            children = node.children.values()
+            if node.is_expanded and all(not child.is_expanded for child in children):
+                if id(node) not in protected:
+                    frontier.append(node)
+            else:
+                stack.extend(child for child in children if child.is_expanded)
+
+        frontier.sort(key=lambda n: n.visit_count)
+        freed = 0
+        for node in frontier:
+            if freed >= target:
+                break
+            freed += len(node.children)
+            self.pool.free_children(node)
+        self.pruned_nodes += freed
+
+
     def backpropagate(self, search_path, value):
         for node in reversed(search_path):
             node.visit_count += 1
@@ -0,0 +1,211 @@
+import pytest
+
+from agents.mcts import DEFAULT_MAX_BRANCHING, MCTS, NodePool, estimate_node_bytes
+
+
+class StubAction:
+    def __init__(self, index):
+        self.index = index
+
+    def to_index(self):
+        return self.index
+
+
+class StubState:
+    """Game tree of fixed depth where every position has `branching` moves."""
+
+    def __init__(self, branching=3, depth=0, max_depth=8, player=1):
+        self.branching = branching
+        self.depth = depth
+        self.max_depth = max_depth
+        self.player = player
+
+    def get_current_player(self):
+        return self.player
+
+    def get_valid_actions(self):
+        return [StubAction(i) for i in range(self.branching)]
+
+    def is_terminal(self):
+        return self.depth >= self.max_depth
+
+    def apply_action(self, action):
+        return StubState(self.branching, self.depth + 1, self.max_depth, -self.player)
+
+    def get_reward(self):
+        return 1.0
+
+
+class StubPolicy:
+    def __init__(self, probs):
+        self.probs = probs
+
+    def detach(self):
+        return self
+
+    def numpy(self):
+        return self.probs
+
+
+class StubNetwork:
+    def __init__(self, branching=3):
+        self.branching = branching
+        self.calls = 0
+
+    def predict(self, state):
+        self.calls += 1
+        return StubPolicy([1 / self.branching] * self.branching), 0.1
+
+
+def make_mcts(network, **config):
+    return MCTS(network, dict({'num_simulations': 200, 'c_puct': 1.0}, **config))
+
+
+def test_search_under_tight_cap_prunes_and_stays_bounded():
+    mcts = make_mcts(StubNetwork(), max_nodes=50)
+    action_probs = mcts.search(StubState())
+
+    assert len(action_probs) == 3
+    assert sum(action_probs.values()) == pytest.approx(1.0)
+    stats = mcts.last_search_stats
+    assert stats['capacity'] == 50
+    assert stats['peak_nodes'] <= 50
+    assert stats['pruned_nodes'] > 0
+    assert stats['peak_bytes_estimate'] == stats['peak_nodes'] * mcts.pool.node_bytes
+
+
+def test_search_reuses_network_value_when_nothing_can_be_pruned():
+    network = StubNetwork()
+    mcts = make_mcts(network, max_nodes=4)
+    mcts.search(StubState())
+
+    # The root and its three children fill the pool: each child is evaluated once, then reused
+    assert network.calls == 1 + 3
+    assert mcts.last_search_stats['pruned_nodes'] == 0
+
+
+def build_tree(mcts, capacity):
+    """Root with children `a` and `b`, each expanded into two leaves."""
+    mcts.pool = NodePool(capacity)
+    root = mcts.pool.allocate(StubState(branching=2))
+    root.is_expanded = True
+    for name in 'ab':
+        child = mcts.pool.allocate(StubState(branching=2, depth=1, player=-1), parent=root, prior=0.5)
+        child.is_expanded = True
+        child.network_value = 0.1
+        for i in range(2):
+            child.children[i] = mcts.pool.allocate(StubState(branching=2, depth=2), parent=child)
+        root.children[name] = child
+    return root, root.children['a'], root.children['b']
+
+
+def test_prune_collapses_least_visited_frontier_first():
+    mcts = make_mcts(StubNetwork(branching=2))
+    root, a, b = build_tree(mcts, capacity=7)
+    a.visit_count, b.visit_count = 5, 1
+
+    mcts.prune(1, [root])
+
+    assert a.is_expanded and len(a.children) == 2
+    assert not b.is_expanded and not b.children
+    assert mcts.pruned_nodes == 2
+    assert mcts.pool.available == 2
+
+
+def test_prune_keeps_nodes_on_search_path():
+    mcts = make_mcts(StubNetwork(branching=2))
+    root, a, b = build_tree(mcts, capacity=7)
+    a.visit_count, b.visit_count = 5, 1
+
+    mcts.prune(1, [root, b])
+
+    assert not a.is_expanded
+    assert b.is_expanded and len(b.children) == 2
+
+
+def test_collapsed_node_is_expanded_again_after_pruning():
+    network = StubNetwork(branching=2)
+    mcts = make_mcts(network)
+    root, a, b = build_tree(mcts, capacity=7)
+    mcts.pool.free_children(b)
+    b.visit_count, b.total_value = 1, 0.0
+    a.visit_count, a.total_value = 10, 0.0
+    root.visit_count = 11
+    mcts.pool.allocate(StubState())  # fill the pool so that b only fits after pruning a
+    assert mcts.pool.available == 1
+
+    mcts.run_simulation(root)
+
+    assert b.is_expanded and len(b.children) == 2
+    assert not a.is_expanded
+    assert network.calls == 1
+
+
+def test_search_raises_when_root_cannot_expand():
+    mcts = make_mcts(StubNetwork(branching=4), max_nodes=3)
+
+    with pytest.raises(RuntimeError, match="cannot hold"):
+        mcts.search(StubState(branching=4))
+    assert mcts.pool.in_use == 0
+
+
+def test_search_returns_every_node_to_the_pool():
+    mcts = make_mcts(StubNetwork())
+    for _ in range(2):
+        mcts.search(StubState())
+        assert mcts.pool.in_use == 0
+        assert mcts.pool.available == mcts.pool.capacity
+
+
+def test_free_all_returns_every_node():
+    pool = NodePool(capacity=5)
+    root = pool.allocate(StubState())
+    for i in range(4):
+        root.children[i] = pool.allocate(StubState(), parent=root)
+
+    assert pool.allocate(StubState()) is None
+    pool.free_all()
+    assert pool.in_use == 0
+    assert pool.available == 5
+    assert all(node.state is None and not node.children for node in pool._nodes)
+    assert pool.allocate(StubState()) is not None
+
+
+def test_search_frees_pool_when_network_raises():
+    class FailingNetwork(StubNetwork):
+        def predict(self, state):
+            if self.calls == 2:
+                raise RuntimeError("network failure")
+            return super().predict(state)
+
+    mcts = make_mcts(FailingNetwork())
+    with pytest.raises(RuntimeError, match="network failure"):
+        mcts.search(StubState())
+    assert mcts.pool.in_use == 0
+    assert mcts.last_search_stats['nodes_in_use'] > 0
+
+
+def test_max_memory_bytes_sets_capacity():
+    state = StubState()
+    node_bytes = estimate_node_bytes(state)
+    mcts = make_mcts(StubNetwork(), max_memory_bytes=10 * node_bytes + 1)
+
+    assert mcts.build_pool(state).capacity == 10
+
+
+def test_max_memory_bytes_smaller_than_one_node_raises():
+    mcts = make_mcts(StubNetwork(), max_memory_bytes=1)
+
+    with pytest.raises(ValueError, match="smaller than one node"):
+        mcts.build_pool(StubState())
+
+
+def test_default_pool_is_sized_from_config_and_grows_lazily():
+    mcts = make_mcts(StubNetwork(), num_simulations=10)
+    pool = mcts.build_pool(StubState())
+
+    assert pool.capacity == 1 + 10 * DEFAULT_MAX_BRANCHING
+    assert len(pool._nodes) == 0
+    mcts.pool = pool
+    mcts.search(StubState())
+    assert len(pool._nodes) == mcts.last_search_stats['peak_nodes']